@@ -0,0 +1,383 @@
+"""Shared helpers for the ``ingest_*`` management commands."""
+
+import gc
+import json
+import logging
+import multiprocessing
+import os
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import django
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, models, transaction
+
+logger = logging.getLogger(__name__)
+
+# Approximate size of the byte range handed to each parse task.  Ranges are
+# read with a single ``read()`` and split in one C-level call instead of
+# iterating the file object line by line.
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def iter_byte_ranges(path, chunk_size: int = READ_CHUNK_SIZE):
+    """Yield ``(start, end)`` offsets covering *path* in line-aligned chunks.
+
+    Each range is roughly *chunk_size* bytes long and is extended to the end
+    of the line it would otherwise cut in half.
+    """
+    with open(path, "rb") as handle:
+        start = 0
+        while True:
+            handle.seek(start + chunk_size)
+            handle.readline()
+            end = handle.tell()
+            if end <= start + chunk_size:  # reached EOF
+                end = handle.seek(0, os.SEEK_END)
+            if end <= start:
+                return
+            yield start, end
+            start = end
+
+
+def parse_jsonl_range(task):
+    """Parse one byte range of a JSONL file with ``parse_line``.
+
+    *task* is a ``(parse_line, path, start, end)`` tuple so the same task list
+    can be mapped in-process or submitted to the pool.  Returns ``(rows,
+    errors, line_count)`` where *errors* holds ``(line_no, message)`` pairs
+    numbered from the start of the range; exceptions are reduced to strings so
+    they always pickle.
+    """
+    parse_line, path, start, end = task
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        lines = handle.read(end - start).split(b"\n")
+    if not lines[-1]:
+        lines.pop()  # range ends with a newline
+
+    rows = []
+    errors = []
+    for line_no, raw_line in enumerate(lines, start=1):
+        if not raw_line or raw_line.isspace():
+            continue  # skip empty lines
+        try:
+            rows.append(parse_line(raw_line))
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append((line_no, str(exc)))
+    return rows, errors, len(lines)
+
+
+# Ranges submitted to the parse pool per worker before the oldest result has
+# to be consumed.  Bounds the parsed rows held in memory when inserting is
+# slower than parsing.
+RANGES_IN_FLIGHT_PER_WORKER = 2
+
+
+def parse_jsonl(path, parse_line, workers: int = 1):
+    """Yield ``parse_jsonl_range`` results for *path*, in file order.
+
+    With more than one worker the ranges are parsed by a process pool; the
+    caller keeps the only database connection and inserts the rows.  At most
+    ``RANGES_IN_FLIGHT_PER_WORKER`` ranges per worker are parsed ahead of the
+    caller.
+    """
+    tasks = [
+        (parse_line, str(path), start, end)
+        for start, end in iter_byte_ranges(path, READ_CHUNK_SIZE)
+    ]
+    if workers <= 1 or len(tasks) <= 1:
+        yield from map(parse_jsonl_range, tasks)
+        return
+
+    # ``django.setup`` makes the pool safe under the "spawn" start method,
+    # where workers re-import the command module from scratch.
+    processes = min(workers, len(tasks))
+    window = processes * RANGES_IN_FLIGHT_PER_WORKER
+    with multiprocessing.Pool(processes, initializer=django.setup) as pool:
+        pending = deque()
+        for task in tasks:
+            if len(pending) == window:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(parse_jsonl_range, (task,)))
+        while pending:
+            yield pending.popleft().get()
+
+
+# ``ingest_jsonl`` runs with the cyclic garbage collector paused and triggers
+# a full collection itself once every this many inserted batches.
+GC_COLLECT_INTERVAL = 50
+
+
+@contextmanager
+def gc_paused():
+    """Disable the cyclic garbage collector for the duration of the block.
+
+    A bulk load allocates millions of short-lived, acyclic row objects, each
+    allocation counting towards the next generation-0 collection.  Callers are
+    expected to ``gc.collect()`` periodically themselves.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+@contextmanager
+def synchronous_commit_off():
+    """Skip the WAL flush wait at every commit in the block on PostgreSQL.
+
+    Meant for loads that commit after each batch: a crash can lose the last
+    few batches reported as committed, but never leaves one half-written.
+    The session setting is reset when the block exits.  A no-op on other
+    backends.
+    """
+    if connection.vendor != "postgresql":
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET synchronous_commit = OFF")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("RESET synchronous_commit")
+
+
+@contextmanager
+def rebuilt_indexes(model):
+    """Drop *model*'s secondary indexes for the duration of the block.
+
+    Unique constraints and non-primary-key indexes are captured from the
+    PostgreSQL catalogue, dropped, and re-created verbatim once the block
+    exits, followed by ``ANALYZE``.  If the block raises inside a transaction
+    the rollback restores them on its own; outside one they are re-created
+    before the exception propagates, and any definition that cannot be
+    re-created is reported with a ``CommandError``.  Other backends are left
+    untouched.
+    """
+    if connection.vendor != "postgresql":
+        logger.warning("Index rebuilding is only supported on PostgreSQL; skipping.")
+        yield
+        return
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'u'
+            """,
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+            FROM pg_index
+            WHERE indrelid = %s::regclass
+              AND NOT indisprimary
+              AND indexrelid NOT IN (
+                  SELECT conindid FROM pg_constraint WHERE conrelid = %s::regclass
+              )
+            """,
+            [table, table],
+        )
+        indexes = cursor.fetchall()
+
+        for name, _ in constraints:
+            cursor.execute(
+                f"ALTER TABLE {table} DROP CONSTRAINT {connection.ops.quote_name(name)}"
+            )
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+
+    statements = [
+        f"ALTER TABLE {table} ADD CONSTRAINT {connection.ops.quote_name(name)} "
+        f"{definition}"
+        for name, definition in constraints
+    ] + [definition for _, definition in indexes]
+
+    def restore():
+        # Inside a transaction the first failure aborts it and the rollback
+        # brings every dropped index back.  Outside one the drops are already
+        # committed, so each definition is re-created on its own and the ones
+        # that fail (e.g. a unique constraint the new rows violate) are
+        # reported for re-creating by hand.
+        failed = []
+        with connection.cursor() as cursor:
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except DatabaseError as exc:
+                    if connection.in_atomic_block:
+                        raise
+                    logger.error("Could not re-create index: %s", exc)
+                    failed.append(statement)
+            cursor.execute(f"ANALYZE {table}")
+        if failed:
+            raise CommandError(
+                "The following indexes could not be re-created and must be "
+                "restored by hand:\n" + ";\n".join(failed) + ";"
+            )
+
+    try:
+        yield
+    except BaseException:
+        if not connection.in_atomic_block:
+            restore()
+        raise
+    restore()
+
+
+def copy_rows(model, columns, rows):
+    """Bulk-load *rows* into *model*'s table.
+
+    Each row is a tuple of Python values ordered like *columns*. On PostgreSQL
+    with psycopg 3 the rows are streamed through ``COPY ... FROM STDIN``; other
+    backends and drivers fall back to a single ``executemany`` INSERT.
+    """
+    if not rows:
+        return
+
+    fields = [model._meta.get_field(column) for column in columns]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column_sql = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+
+    with connection.cursor() as cursor:
+        # Only psycopg 3 cursors expose ``copy()``; psycopg2 does not.
+        if connection.vendor == "postgresql" and hasattr(cursor.cursor, "copy"):
+            json_idx = [
+                i for i, f in enumerate(fields) if isinstance(f, models.JSONField)
+            ]
+            with cursor.cursor.copy(
+                f"COPY {table} ({column_sql}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    if json_idx:
+                        row = list(row)
+                        for i in json_idx:
+                            if row[i] is not None:
+                                row[i] = json.dumps(row[i])
+                    copy.write_row(row)
+        else:
+            placeholders = ", ".join(["%s"] * len(fields))
+            cursor.executemany(
+                f"INSERT INTO {table} ({column_sql}) VALUES ({placeholders})",
+                [
+                    [f.get_db_prep_save(v, connection) for f, v in zip(fields, row)]
+                    for row in rows
+                ],
+            )
+
+
+def add_load_arguments(parser):
+    """Add the loading options shared by the ``ingest_*`` commands."""
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help=(
+            "Number of processes used to parse the file (default: one per CPU). "
+            "Rows are still inserted over a single database connection."
+        ),
+    )
+    parser.add_argument(
+        "--no-atomic",
+        action="store_false",
+        dest="atomic",
+        help=(
+            "Commit after every batch instead of wrapping the whole import in a "
+            "single transaction (useful for very large files)."
+        ),
+    )
+    parser.add_argument(
+        "--rebuild-indexes",
+        action="store_true",
+        help=(
+            "Drop the table's unique constraints and secondary indexes before "
+            "loading and re-create them afterwards (PostgreSQL only)."
+        ),
+    )
+
+
+def ingest_jsonl(
+    path,
+    model,
+    columns,
+    parse_line,
+    *,
+    batch_size: int,
+    ignore_errors: bool = False,
+    workers: int = 1,
+    atomic: bool = True,
+    rebuild_indexes: bool = False,
+):
+    """Load the JSONL file at *path* into *model*'s table.
+
+    *parse_line* turns one line into a row tuple ordered like *columns*; lines
+    it cannot parse abort the import with a ``CommandError``, or are logged
+    and skipped with *ignore_errors*.  The remaining options match the ones
+    added by ``add_load_arguments``.  ``COPY`` does not skip conflicting rows,
+    so duplicate keys abort the import too.  Returns the number of rows
+    imported.
+    """
+    # A single transaction has a single commit to wait for; only per-batch
+    # commits are worth making asynchronous.
+    commits = nullcontext() if atomic else synchronous_commit_off()
+    atomic_block = transaction.atomic() if atomic else nullcontext()
+    indexes = rebuilt_indexes(model) if rebuild_indexes else nullcontext()
+    with commits, atomic_block, indexes:
+        chunks = parse_jsonl(path, parse_line, workers)
+        rows = _checked_rows(chunks, ignore_errors)
+        imported = 0
+        with gc_paused():
+            for batch_no, batch in enumerate(_batches(rows, batch_size), start=1):
+                copy_rows(model, columns, batch)
+                imported += len(batch)
+                if batch_no % GC_COLLECT_INTERVAL == 0:
+                    gc.collect()
+    return imported
+
+
+def _checked_rows(chunks, ignore_errors):
+    """Yield the rows of each ``parse_jsonl`` result after reporting its errors."""
+    line_offset = 0
+    for rows, errors, line_count in chunks:
+        for line_no, error in errors:
+            msg = f"Line {line_offset + line_no}: {error}"
+            if not ignore_errors:
+                raise CommandError(msg)
+            logger.warning(msg)
+        line_offset += line_count
+        yield rows
+
+
+def _batches(chunks, batch_size):
+    """Regroup lists of rows into lists of exactly *batch_size* rows.
+
+    Batches are sliced straight out of each list; only a tail shorter than a
+    batch is carried over and topped up from the next list.  The last batch
+    may be shorter.
+    """
+    carry = []
+    for rows in chunks:
+        start = 0
+        if carry:
+            start = batch_size - len(carry)
+            carry += rows[:start]
+            if len(carry) < batch_size:
+                continue
+            yield carry
+        end = start + batch_size
+        while end <= len(rows):
+            yield rows[start:end]
+            start, end = end, end + batch_size
+        carry = rows[start:]
+    if carry:
+        yield carry
@@ -1,13 +1,69 @@
-import json
-import logging
 from pathlib import Path
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 
+from api.ingest import add_load_arguments, ingest_jsonl
 from api.models import Person
 
-logger = logging.getLogger(__name__)
+# ----------------------------------------------------------------------------
+# orjson parses ``bytes`` directly and is considerably faster than the stdlib
+# decoder; fall back to ``json`` when it is not installed.
+# ----------------------------------------------------------------------------
+try:
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover -- optional dependency
+    from json import loads as json_loads
+
+# ----------------------------------------------------------------------------
+# pysimdjson lets us pull just the ``Person`` columns out of each line without
+# materialising the whole object tree; each line becomes a plain tuple ordered
+# like ``PERSON_FIELDS`` rather than a model instance.  A single ``Parser`` is shared across
+# lines so its internal buffers are allocated once per import.
+# ----------------------------------------------------------------------------
+try:
+    import simdjson
+except ImportError:  # pragma: no cover -- optional dependency
+    simdjson = None
+
+PERSON_FIELDS = (
+    "customer_org_id",
+    "id",
+    "first_name",
+    "last_name",
+    "email_address",
+    "job_title",
+)
+
+# Every ``Person`` column is a plain string; objects and arrays are rejected so
+# that neither nested data nor simdjson proxies reach the database.
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _check_person(row):
+    """Return *row* unchanged, or raise ``ValueError`` if it holds a non-scalar."""
+    for key, value in zip(PERSON_FIELDS, row):
+        if not isinstance(value, _SCALAR_TYPES):
+            raise ValueError(
+                f"'{key}' must be a string, number or null, not {type(value).__name__}"
+            )
+    return row
+
+
+if simdjson is not None:
+    parser = simdjson.Parser()
+
+    def _parse_person(raw_line):
+        # ``doc`` and any ``Object``/``Array`` proxies taken from it must not
+        # outlive this call: simdjson refuses to re-use a parser while they are
+        # still alive, so rows holding one are rejected rather than returned.
+        doc = parser.parse(raw_line)
+        return _check_person(tuple(map(doc.get, PERSON_FIELDS)))
+
+else:  # pragma: no cover -- exercised only without pysimdjson
+
+    def _parse_person(raw_line):
+        data = json_loads(raw_line)
+        return _check_person(tuple(map(data.get, PERSON_FIELDS)))
 
 
 class Command(BaseCommand):
@@ -15,7 +71,8 @@ class Command(BaseCommand):
 
     Each line in the input file must be a valid JSON object whose keys map 1-to-1
     with the fields on the ``Person`` model. See ``server/data/persons.jsonl`` for
-    an example fixture.
+    an example fixture. Keys outside ``PERSON_FIELDS`` are ignored; missing or
+    invalid values are rejected by the database constraints at insert time.
     """
 
     help = __doc__.strip().split("\n")[0]
@@ -30,7 +87,7 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=1000,
-            help="Number of rows to insert per bulk_create batch (default: 1000)",
+            help="Number of rows to insert per batch (default: 1000)",
         )
         parser.add_argument(
             "--ignore-errors",
@@ -39,6 +96,7 @@ class Command(BaseCommand):
                 "Skip lines that cannot be parsed instead of aborting the entire import.",
             ),
         )
+        add_load_arguments(parser)
 
     def handle(self, *args, **options):
         jsonl_path = Path(options["jsonl_path"])
@@ -47,51 +105,27 @@ class Command(BaseCommand):
 
         if not jsonl_path.exists():
             raise CommandError(f"File not found: {jsonl_path}")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer")
 
         self.stdout.write(
             f"Starting import from {jsonl_path} (batch size {batch_size})"
         )
 
-        objs = []
-        lines_processed = 0
-        with jsonl_path.open("r", encoding="utf-8") as handle:
-            for line_no, raw_line in enumerate(handle, start=1):
-                raw_line = raw_line.strip()
-                if not raw_line:
-                    continue  # skip empty lines
-                try:
-                    data = json.loads(raw_line)
-                    objs.append(Person(**data))
-                except Exception as exc:  # pylint: disable=broad-except
-                    msg = f"Line {line_no}: {exc}"
-                    if ignore_errors:
-                        logger.warning(msg)
-                        continue
-                    raise CommandError(msg) from exc
-
-                if len(objs) >= batch_size:
-                    self._bulk_insert(objs)
-                    lines_processed += len(objs)
-                    objs.clear()
-
-        if objs:
-            self._bulk_insert(objs)
-            lines_processed += len(objs)
+        lines_processed = ingest_jsonl(
+            jsonl_path,
+            Person,
+            PERSON_FIELDS,
+            _parse_person,
+            batch_size=batch_size,
+            ignore_errors=ignore_errors,
+            workers=options["workers"],
+            atomic=options["atomic"],
+            rebuild_indexes=options["rebuild_indexes"],
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"Successfully imported {lines_processed} Person records."
             )
         )
-
-    # ---------------------------------------------------------------------
-    # Helpers
-    # ---------------------------------------------------------------------
-
-    @staticmethod
-    def _bulk_insert(objects):
-        """Insert objects inside a transaction to ensure atomicity."""
-        with transaction.atomic():
-            # We do *not* ignore conflicts here so that the caller is notified
-            # about duplicate primary keys or unique constraint violations.
-            Person.objects.bulk_create(objects, ignore_conflicts=False) 
\ No newline at end of file
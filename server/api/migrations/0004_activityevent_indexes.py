@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-14 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_person"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activityevent",
+            index=models.Index(
+                fields=["customer_org_id", "account_id", "-timestamp"],
+                name="ae_cust_acct_ts_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="activityevent",
+            index=models.Index(
+                condition=models.Q(("direction", "IN")),
+                fields=["customer_org_id", "account_id", "timestamp"],
+                name="ae_in_cust_acct_ts_idx",
+            ),
+        ),
+    ]
@@ -48,6 +48,21 @@ class ActivityEvent(models.Model):
             "account_id",
             "touchpoint_id",
         )
+        indexes = [
+            # Per-account event listing, newest first (``activity_events``).
+            models.Index(
+                fields=["customer_org_id", "account_id", "-timestamp"],
+                name="ae_cust_acct_ts_idx",
+            ),
+            # Daily inbound counts for the timeline minimap.  A plain partial
+            # index: an expression index on ``TruncDate`` would compile to a
+            # Django-only function on SQLite.
+            models.Index(
+                fields=["customer_org_id", "account_id", "timestamp"],
+                name="ae_in_cust_acct_ts_idx",
+                condition=models.Q(direction="IN"),
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.channel} | {self.activity[:50]}... @ {self.timestamp.isoformat()}"
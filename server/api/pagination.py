@@ -0,0 +1,73 @@
+import json
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class LazyPage(Page):
+    """A page whose ``has_next`` comes from probing one row past its end."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class LazyPaginator(Paginator):
+    """Paginator that avoids ``SELECT COUNT(*)``.
+
+    Each page fetches ``per_page + 1`` rows so ``has_next`` is known without
+    counting.  ``count`` is the PostgreSQL planner's row estimate for the
+    queryset (never less than the rows already seen); other backends only
+    report that lower bound.  Like ``Paginator``, ``page()`` raises
+    ``EmptyPage`` past the end and ``get_page()`` falls back to the last page;
+    finding that page is the one case that counts the rows exactly.
+    """
+
+    # Rows known to exist from the last page fetched.
+    _rows_seen = 0
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except (PageNotAnInteger, EmptyPage):
+            number = 1
+        try:
+            return self.page(number)
+        except EmptyPage:
+            self.count = self.object_list.count()
+            return self.page(self.num_pages)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        has_next = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        self._rows_seen = bottom + len(rows) + has_next
+        return LazyPage(rows, number, self, has_next)
+
+    @cached_property
+    def count(self):
+        estimate = 0
+        connection = connections[self.object_list.db]
+        if connection.vendor == "postgresql":
+            plan = json.loads(self.object_list.explain(format="json"))
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+        return max(estimate, self._rows_seen)
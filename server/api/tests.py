@@ -1,3 +1,407 @@
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import EmptyPage
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import ingest, views
+from .models import ActivityEvent, Person
+from .pagination import LazyPaginator
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _write_jsonl(directory, name, records):
+    """Write *records* (dicts or raw strings) as one JSON document per line."""
+    path = Path(directory) / name
+    path.write_text(
+        "".join(
+            (r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records
+        )
+    )
+    return path
+
+
+def _event(touchpoint_id, **overrides):
+    return {
+        "customer_org_id": "org_1",
+        "account_id": "acct_1",
+        "touchpoint_id": touchpoint_id,
+        "timestamp": 1704067200000,
+        "activity": "Email opened",
+        "channel": "Email",
+        "status": "done",
+        "record_type": "email",
+        "direction": "IN",
+        "people": [],
+        "involved_team_ids": [],
+        "related_opportunity_ids": [],
+        **overrides,
+    }
+
+
+def _create_event(touchpoint_id, hours=0, **overrides):
+    """Create an event *hours* after ``T0``."""
+    return ActivityEvent.objects.create(
+        **_event(touchpoint_id, timestamp=T0 + timedelta(hours=hours), **overrides)
+    )
+
+
+def _person(person_id, **overrides):
+    return {
+        "customer_org_id": "org_1",
+        "id": person_id,
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email_address": f"{person_id}@example.com",
+        "job_title": "Engineer",
+        **overrides,
+    }
+
+
+def _create_people_events():
+    """Events whose ``people`` cover every shape the person queries handle."""
+    people_by_event = [
+        [{"id": "p1"}, {"id": "p2"}],
+        [{"id": "p2"}, {"id": "p3", "name": "Cy"}],
+        [{"name": "no id"}, "p4", 5, None],
+        {"id": "p5"},  # not a list
+        "p6",
+        [],
+        [{"id": None}, {"id": "p7"}],
+        [{"id": "p1"}, {"id": "p8"}],
+    ]
+    for n, people in enumerate(people_by_event):
+        _create_event(f"tp_{n}", hours=n, people=people)
+    # Same people on another account, earlier than all of the above.
+    _create_event(
+        "tp_other", hours=-24, account_id="acct_2", people=[{"id": "p8"}, {"id": "p9"}]
+    )
+
+
+class IngestPersonsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = _write_jsonl(
+            tmp.name,
+            "persons.jsonl",
+            [
+                _person("p1", job_title={"t": 1}),
+                _person("p2"),
+                _person("p3", job_title=None),
+            ],
+        )
+
+    def ingest(self, *args):
+        call_command(
+            "ingest_persons",
+            str(self.path),
+            "--workers",
+            "1",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_nested_value_is_rejected_without_breaking_later_lines(self):
+        with self.assertLogs("api", "WARNING") as logs:
+            self.ingest("--ignore-errors")
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Line 1: 'job_title'", logs.output[0])
+        self.assertQuerySetEqual(
+            Person.objects.order_by("id").values_list("id", "job_title"),
+            [("p2", "Engineer"), ("p3", None)],
+        )
+
+    def test_nested_value_aborts_import_at_its_line(self):
+        with self.assertRaisesMessage(CommandError, "Line 1: 'job_title'"):
+            self.ingest()
+        self.assertFalse(Person.objects.exists())
+
+
+class IngestLineNumberTests(TestCase):
+    """Errors are reported against their line in the file, not in the range."""
+
+    # Small enough that the file below spans many byte ranges.
+    CHUNK_SIZE = 300
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        lines = [_event(f"tp_{n}") for n in range(1, 41)]
+        self.bad_lines = [2, 17, 18, 39]
+        for line_no in self.bad_lines:
+            lines[line_no - 1] = '{"broken": '
+        lines[9] = ""  # a blank line still counts towards the numbering
+        self.path = _write_jsonl(tmp.name, "events.jsonl", lines)
+
+    def test_byte_ranges_cover_the_file_on_line_boundaries(self):
+        data = self.path.read_bytes()
+        ranges = list(ingest.iter_byte_ranges(self.path, self.CHUNK_SIZE))
+
+        self.assertGreater(len(ranges), 5)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1 : end], b"\n")
+
+    def test_error_line_numbers_span_ranges(self):
+        for workers in ("1", "2"):
+            with self.subTest(workers=workers):
+                with mock.patch.object(
+                    ingest, "READ_CHUNK_SIZE", self.CHUNK_SIZE
+                ), self.assertLogs("api", "WARNING") as logs:
+                    call_command(
+                        "ingest_activityevents",
+                        str(self.path),
+                        "--ignore-errors",
+                        "--workers",
+                        workers,
+                        "--batch-size",
+                        "7",
+                        stdout=StringIO(),
+                    )
+
+                reported = [
+                    int(message.split("Line ")[1].split(":")[0])
+                    for message in logs.output
+                ]
+                self.assertEqual(reported, self.bad_lines)
+                self.assertEqual(ActivityEvent.objects.count(), 40 - 1 - 4)
+                ActivityEvent.objects.all().delete()
+
+    def test_first_error_aborts_import(self):
+        with mock.patch.object(ingest, "READ_CHUNK_SIZE", self.CHUNK_SIZE):
+            with self.assertRaisesMessage(CommandError, "Line 2:"):
+                call_command(
+                    "ingest_activityevents",
+                    str(self.path),
+                    "--workers",
+                    "1",
+                    stdout=StringIO(),
+                )
+        self.assertFalse(ActivityEvent.objects.exists())
+
+
+class LazyPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(5):
+            _create_event(f"tp_{n}", hours=n)
+
+    def paginator(self, queryset=None, per_page=2):
+        if queryset is None:
+            queryset = ActivityEvent.objects.order_by("-timestamp").values("id")
+        return LazyPaginator(queryset, per_page)
+
+    def test_first_page(self):
+        paginator = self.paginator()
+        page = paginator.get_page(1)
+
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        # Only the rows probed so far are known to exist.
+        self.assertGreaterEqual(paginator.count, 3)
+        self.assertGreaterEqual(paginator.num_pages, 2)
+
+    def test_last_page(self):
+        paginator = self.paginator()
+        page = paginator.get_page(3)
+
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+        self.assertGreaterEqual(paginator.count, 5)
+        self.assertGreaterEqual(paginator.num_pages, 3)
+
+    def test_last_page_exactly_full(self):
+        paginator = self.paginator(per_page=5)
+        page = paginator.get_page(1)
+
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+
+    def test_page_past_the_end_falls_back_to_the_last_page(self):
+        paginator = self.paginator()
+        page = paginator.get_page(9999)
+
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 1)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_page_past_the_end_raises(self):
+        with self.assertRaises(EmptyPage):
+            self.paginator().page(4)
+
+    def test_invalid_page_numbers_fall_back_to_the_first_page(self):
+        for number in (0, -1, "x", None, 1.5):
+            with self.subTest(number=number):
+                self.assertEqual(self.paginator().get_page(number).number, 1)
+
+    def test_empty_queryset(self):
+        queryset = ActivityEvent.objects.filter(account_id="nope").values("id")
+        for number in (1, 2):
+            with self.subTest(number=number):
+                paginator = self.paginator(queryset)
+                page = paginator.get_page(number)
+
+                self.assertEqual(page.number, 1)
+                self.assertEqual(len(page), 0)
+                self.assertFalse(page.has_next())
+                self.assertEqual(paginator.num_pages, 1)
+
+
+class PersonIdsTests(TestCase):
+    """The person-id SQL agrees with its Python fallback."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _create_people_events()
+
+    def test_person_ids(self):
+        events = list(
+            ActivityEvent.objects.filter(account_id="acct_1")
+            .order_by("timestamp")
+            .values("id", "people")
+        )
+
+        self.assertEqual(
+            views._person_ids(events), {"p1", "p2", "p3", "p7", "p8", None}
+        )
+        self.assertEqual(views._person_ids(events), views._collect_person_ids(events))
+        self.assertEqual(views._person_ids(events[:1]), {"p1", "p2"})
+        self.assertEqual(views._person_ids([]), set())
+
+
+class FirstTouchpointsTests(TestCase):
+    """The first-touchpoint SQL agrees with its Python fallback."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _create_people_events()
+
+    def test_first_touchpoints(self):
+        def by_person(touchpoints):
+            return sorted(
+                touchpoints, key=lambda t: (t["person_id"] is None, t["person_id"] or "")
+            )
+
+        events = ActivityEvent.objects.filter(
+            customer_org_id="org_1", account_id="acct_1"
+        ).exclude(people__isnull=True).exclude(people=[]).order_by("timestamp")
+        first_touchpoints = views._first_touchpoints("org_1", "acct_1")
+
+        self.assertEqual(
+            by_person(first_touchpoints),
+            by_person(views._compute_first_touchpoints(events)),
+        )
+        timestamps = [t["timestamp"] for t in first_touchpoints]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(
+            [(t["person_id"], t["timestamp"]) for t in by_person(first_touchpoints)],
+            [
+                ("p1", T0),
+                ("p2", T0),
+                ("p3", T0 + timedelta(hours=1)),
+                ("p7", T0 + timedelta(hours=6)),
+                ("p8", T0 + timedelta(hours=7)),
+                (None, T0 + timedelta(hours=6)),
+            ],
+        )
+        self.assertEqual(first_touchpoints[0]["date"], T0.date())
+
+
+class DateNavigationTests(TestCase):
+    """``activity_events?date=`` opens the page holding the events up to that day."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(5):
+            _create_event(f"tp_{n}", hours=24 * n)
+
+    def get_page(self, target_date, **params):
+        response = self.client.get(
+            "/api/events/",
+            {
+                "customer_org_id": "org_1",
+                "account_id": "acct_1",
+                "page_size": 2,
+                "date": target_date,
+                **params,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["pagination"]["current_page"]
+
+    def test_page_for_date(self):
+        # Two events fall on or before 2024-01-02.
+        self.assertEqual(self.get_page("2024-01-02"), 2)
+        self.assertEqual(self.get_page("2024-01-02", exact_count=0), 2)
+
+    def test_dates_before_and_after_every_event(self):
+        self.assertEqual(self.get_page("0001-01-01"), 1)
+        self.assertEqual(self.get_page("2030-01-01"), 3)
+
+    def test_last_representable_date(self):
+        self.assertEqual(self.get_page("9999-12-31"), 3)
+
+    def test_invalid_date_is_ignored(self):
+        self.assertEqual(self.get_page("not-a-date"), 1)
+
+
+class PersonCacheTests(TestCase):
+    """``_persons_by_id`` only looks up the people it has not cached yet."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for person_id in ("p1", "p2", "p3"):
+            Person.objects.create(**_person(person_id))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_second_call_is_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            first = views._persons_by_id("org_1", {"p1", "p2"})
+        with self.assertNumQueries(0):
+            second = views._persons_by_id("org_1", {"p1", "p2"})
+
+        self.assertEqual(set(first), {"p1", "p2"})
+        self.assertEqual(second, first)
+        self.assertEqual(first["p1"]["email_address"], "p1@example.com")
+
+    def test_only_missing_ids_are_queried(self):
+        views._persons_by_id("org_1", {"p1"})
+
+        with CaptureQueriesContext(connection) as queries:
+            persons = views._persons_by_id("org_1", {"p1", "p3"})
+
+        self.assertEqual(set(persons), {"p1", "p3"})
+        self.assertEqual(len(queries), 1)
+        self.assertIn("'p3'", queries[0]["sql"])
+        self.assertNotIn("'p1'", queries[0]["sql"])
+
+    def test_unknown_ids_are_not_cached(self):
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(views._persons_by_id("org_1", {"ghost"}), {})
+
+    def test_cache_is_per_customer(self):
+        views._persons_by_id("org_1", {"p1"})
 
-# Create your tests here.
+        with self.assertNumQueries(1):
+            self.assertEqual(views._persons_by_id("org_2", {"p1"}), {})
@@ -1,17 +1,244 @@
 from django.shortcuts import render
 from django.http import HttpResponse, JsonResponse
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import QuerySet, Count
 from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.core.paginator import Paginator
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+import hashlib
 import json
 
+# orjson serializes datetimes natively and is much faster than the stdlib
+# encoder behind JsonResponse; fall back to the latter when it is missing.
+try:
+    import orjson
+except ImportError:  # pragma: no cover -- optional dependency
+    orjson = None
+
 # Create your views here.
 
 def index(request):
     return HttpResponse("Hello, world! This is the API root.")
 
 from .models import ActivityEvent, Person
+from .pagination import LazyPaginator
+
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+
+def json_response(payload, status=200):
+    """Serialize *payload* (any JSON-compatible value) into a JSON response.
+
+    Naive datetimes are treated as UTC and UTC offsets are written as ``Z``.
+    """
+    if orjson is None:
+        return JsonResponse(payload, status=status, safe=False)
+    return HttpResponse(
+        orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z),
+        content_type="application/json",
+        status=status,
+    )
+
+
+# Distinct person ids referenced by a set of events, keyed by
+# ``connection.vendor``.  ``{ids}`` expands to one placeholder per event id.
+_PERSON_IDS_SQL = {
+    "postgresql": """
+        SELECT DISTINCT p->>'id'
+        FROM api_activityevent e
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(e.people) = 'array' THEN e.people ELSE '[]' END
+        ) AS p
+        WHERE e.id IN ({ids})
+          AND jsonb_typeof(p) = 'object'
+          AND p->'id' IS NOT NULL
+    """,
+    "sqlite": """
+        SELECT DISTINCT json_extract(p.value, '$.id')
+        FROM api_activityevent e,
+             json_each(
+                 CASE WHEN json_type(e.people) = 'array' THEN e.people ELSE '[]' END
+             ) AS p
+        WHERE e.id IN ({ids})
+          AND p.type = 'object'
+          AND json_type(p.value, '$.id') IS NOT NULL
+    """,
+}
+
+
+def _person_ids(events):
+    """Return the ids of everyone listed in the ``people`` of *events*.
+
+    *events* are ``.values()`` rows; on PostgreSQL and SQLite the ids are
+    extracted and de-duplicated by the database from the event ids alone,
+    other backends fall back to ``_collect_person_ids``.
+    """
+    if not events:
+        return set()
+
+    sql = _PERSON_IDS_SQL.get(connection.vendor)
+    if sql is None:
+        return _collect_person_ids(events)
+
+    event_ids = [event['id'] for event in events]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(ids=", ".join(["%s"] * len(event_ids))), event_ids)
+        return {person_id for (person_id,) in cursor.fetchall()}
+
+
+def _collect_person_ids(events):
+    """Collect the person ids from the ``people`` of *events* in Python."""
+    person_ids = set()
+    for event in events:
+        people = event['people']
+        if people and isinstance(people, list):
+            for person in people:
+                if isinstance(person, dict) and 'id' in person:
+                    person_ids.add(person['id'])
+    return person_ids
+
+
+# How long (seconds) a person's details are served from the cache.
+PERSON_CACHE_TIMEOUT = 300
+
+
+def _person_cache_key(customer_org_id, person_id):
+    """Cache key for one person of a customer.
+
+    The ids come from the query string and the event data, so they are hashed
+    to keep the key valid for every cache backend (e.g. memcached rejects
+    spaces, control characters and keys over 250 characters).
+    """
+    digest = hashlib.md5(
+        repr((customer_org_id, person_id)).encode(), usedforsecurity=False
+    )
+    return f"person:{digest.hexdigest()}"
+
+
+def _persons_by_id(customer_org_id, person_ids):
+    """Return ``{person_id: details}`` for the given people of a customer.
+
+    Consecutive pages of an account mostly involve the same people, so each
+    person's details are cached per ``(customer_org_id, person_id)`` and only
+    the ids missing from the cache are looked up.  Unknown ids are not cached.
+    """
+    if not person_ids:
+        return {}
+
+    keys = {_person_cache_key(customer_org_id, pid): pid for pid in person_ids}
+    cached = cache.get_many(keys)
+    persons_dict = {keys[key]: details for key, details in cached.items()}
+
+    missing = [pid for key, pid in keys.items() if key not in cached]
+    if missing:
+        persons = Person.objects.filter(
+            customer_org_id=customer_org_id,
+            id__in=missing
+        ).order_by().values(
+            'id', 'first_name', 'last_name', 'email_address', 'job_title'
+        )
+        # Key each row by its id; the remaining columns are the payload.
+        fetched = {p.pop('id'): p for p in persons}
+        cache.set_many(
+            {_person_cache_key(customer_org_id, pid): p for pid, p in fetched.items()},
+            timeout=PERSON_CACHE_TIMEOUT,
+        )
+        persons_dict.update(fetched)
+    return persons_dict
+
+
+# Earliest event per person on an account, computed in the database by
+# expanding each event's ``people`` array.  Keyed by ``connection.vendor``.
+_FIRST_TOUCHPOINTS_SQL = {
+    "postgresql": """
+        SELECT p->>'id' AS person_id, MIN(e.timestamp) AS first_timestamp
+        FROM api_activityevent e
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(e.people) = 'array' THEN e.people ELSE '[]' END
+        ) AS p
+        WHERE e.customer_org_id = %s
+          AND e.account_id = %s
+          AND jsonb_typeof(p) = 'object'
+          AND p->'id' IS NOT NULL
+        GROUP BY 1
+        ORDER BY 2, 1
+    """,
+    "sqlite": """
+        SELECT json_extract(p.value, '$.id') AS person_id,
+               MIN(e.timestamp) AS first_timestamp
+        FROM api_activityevent e,
+             json_each(
+                 CASE WHEN json_type(e.people) = 'array' THEN e.people ELSE '[]' END
+             ) AS p
+        WHERE e.customer_org_id = %s
+          AND e.account_id = %s
+          AND p.type = 'object'
+          AND json_type(p.value, '$.id') IS NOT NULL
+        GROUP BY 1
+        ORDER BY 2, 1
+    """,
+}
+
+
+def _first_touchpoints(customer_org_id, account_id):
+    """Return the first touchpoint of every person involved with an account.
+
+    Runs a single aggregate query on PostgreSQL and SQLite so only one row per
+    person reaches Python; other backends scan the events in timestamp order.
+    """
+    sql = _FIRST_TOUCHPOINTS_SQL.get(connection.vendor)
+    if sql is None:
+        events_with_people = ActivityEvent.objects.filter(
+            customer_org_id=customer_org_id,
+            account_id=account_id
+        ).exclude(people__isnull=True).exclude(people=[]).order_by('timestamp')
+        return _compute_first_touchpoints(events_with_people)
+
+    # Apply the same conversions the ORM would (e.g. SQLite stores datetimes
+    # as naive text).
+    field = ActivityEvent._meta.get_field('timestamp')
+    col = field.get_col(ActivityEvent._meta.db_table)
+    converters = (
+        connection.ops.get_db_converters(col) + field.get_db_converters(connection)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [customer_org_id, account_id])
+        rows = cursor.fetchall()
+
+    first_touchpoints = []
+    for person_id, timestamp in rows:
+        for converter in converters:
+            timestamp = converter(timestamp, col, connection)
+        first_touchpoints.append({
+            'person_id': person_id,
+            'timestamp': timestamp,
+            'date': timestamp.date()
+        })
+    return first_touchpoints
+
+
+def _compute_first_touchpoints(events):
+    """Pick each person's first touchpoint from *events* ordered by timestamp."""
+    first_touchpoints = []
+    seen_people = set()
+    for event in events:
+        if event.people and isinstance(event.people, list):
+            for person in event.people:
+                if isinstance(person, dict) and 'id' in person:
+                    person_id = person['id']
+                    if person_id not in seen_people:
+                        seen_people.add(person_id)
+                        first_touchpoints.append({
+                            'person_id': person_id,
+                            'timestamp': event.timestamp,
+                            'date': event.timestamp.date()
+                        })
+    return first_touchpoints
 
 
 # -----------------------------------------------------------------------------
@@ -29,13 +256,15 @@ def random_activity_events(request):
     account_id = request.GET.get("account_id")
 
     if not customer_org_id or not account_id:
-        return JsonResponse(
+        return json_response(
             {
                 "error": "Both 'customer_org_id' and 'account_id' query parameters are required."
             },
             status=400,
         )
 
+    # ``ORDER BY RANDOM() LIMIT 10`` is a single scan of the account's rows
+    # with a top-N sort; sampling by offset or in Python measured slower.
     events_qs: QuerySet = (
         ActivityEvent.objects.filter(
             customer_org_id=customer_org_id, account_id=account_id
@@ -45,7 +274,7 @@ def random_activity_events(request):
 
     # Use .values() to get dictionaries of all model fields.
     events = list(events_qs.values())
-    return JsonResponse(events, safe=False)
+    return json_response(events)
 
 def random_persons(request):
     """Return up to 5 random Person records for the given customer.
@@ -57,7 +286,7 @@ def random_persons(request):
     customer_org_id = request.GET.get("customer_org_id")
 
     if not customer_org_id:
-        return JsonResponse(
+        return json_response(
             {"error": "'customer_org_id' query parameter is required."},
             status=400,
         )
@@ -67,7 +296,7 @@ def random_persons(request):
     )
 
     persons = list(persons_qs.values())
-    return JsonResponse(persons, safe=False)
+    return json_response(persons)
 
 def activity_events(request):
     """Return paginated activity events for the given customer and account.
@@ -78,76 +307,71 @@ def activity_events(request):
     - page (optional, default=1)
     - page_size (optional, default=50)
     - date (optional, format: YYYY-MM-DD, for navigation to specific date)
+    - exact_count (optional, default=1; pass 0 to skip COUNT(*) and report an
+      estimated total_count/total_pages instead.  Navigating by ``date`` or
+      to a page past the end still counts the matching rows.)
     """
     customer_org_id = request.GET.get("customer_org_id")
     account_id = request.GET.get("account_id")
     page = int(request.GET.get("page", 1))
     page_size = int(request.GET.get("page_size", 50))
     target_date = request.GET.get("date")
+    exact_count = request.GET.get("exact_count") != "0"
 
     if not customer_org_id or not account_id:
-        return JsonResponse(
+        return json_response(
             {
                 "error": "Both 'customer_org_id' and 'account_id' query parameters are required."
             },
             status=400,
         )
 
+    # Only the serialized columns are fetched, as plain dictionaries.
     events_qs = ActivityEvent.objects.filter(
         customer_org_id=customer_org_id,
         account_id=account_id
-    ).order_by('-timestamp')
+    ).order_by('-timestamp').values(
+        'id',
+        'timestamp',
+        'activity',
+        'channel',
+        'status',
+        'direction',
+        'people',
+        'involved_team_ids',
+    )
 
     # If navigating to specific date, find the page containing that date
     if target_date:
         try:
-            target_datetime = datetime.strptime(target_date, '%Y-%m-%d')
-            # Find events on or before the target date
-            events_before = events_qs.filter(timestamp__date__lte=target_datetime).count()
-            page = max(1, (events_before // page_size) + 1)
+            target_day = datetime.fromisoformat(target_date).date()
+            # Find events on or before the target date.  Compare against the
+            # start of the next day so the timestamp index can serve a range
+            # scan instead of casting every row to a date; every event is on
+            # or before the last representable date.
+            events_before = events_qs
+            if target_day < date.max:
+                upper = timezone.make_aware(
+                    datetime.combine(target_day + timedelta(days=1), time.min)
+                )
+                events_before = events_before.filter(timestamp__lt=upper)
+            # This count is needed even with exact_count=0: an estimate
+            # would land on the wrong page.
+            page = max(1, (events_before.count() // page_size) + 1)
         except ValueError:
             pass  # Invalid date format, ignore
 
-    paginator = Paginator(events_qs, page_size)
+    paginator_class = Paginator if exact_count else LazyPaginator
+    paginator = paginator_class(events_qs, page_size)
     page_obj = paginator.get_page(page)
 
     # Get person data for involved people
-    all_person_ids = set()
-    for event in page_obj:
-        if event.people and isinstance(event.people, list):
-            for person in event.people:
-                if isinstance(person, dict) and 'id' in person:
-                    all_person_ids.add(person['id'])
+    events_data = list(page_obj)
+    all_person_ids = _person_ids(events_data)
 
-    persons_dict = {}
-    if all_person_ids:
-        persons = Person.objects.filter(
-            customer_org_id=customer_org_id,
-            id__in=all_person_ids
-        )
-        persons_dict = {p.id: {
-            'first_name': p.first_name,
-            'last_name': p.last_name,
-            'email_address': p.email_address,
-            'job_title': p.job_title
-        } for p in persons}
-
-    # Serialize events
-    events_data = []
-    for event in page_obj:
-        event_data = {
-            'id': event.id,
-            'timestamp': event.timestamp.isoformat(),
-            'activity': event.activity,
-            'channel': event.channel,
-            'status': event.status,
-            'direction': event.direction,
-            'people': event.people,
-            'involved_team_ids': event.involved_team_ids,
-        }
-        events_data.append(event_data)
+    persons_dict = _persons_by_id(customer_org_id, all_person_ids)
 
-    return JsonResponse({
+    return json_response({
         'events': events_data,
         'persons': persons_dict,
         'pagination': {
@@ -170,7 +394,7 @@ def activity_timeline_data(request):
     account_id = request.GET.get("account_id")
 
     if not customer_org_id or not account_id:
-        return JsonResponse(
+        return json_response(
             {
                 "error": "Both 'customer_org_id' and 'account_id' query parameters are required."
             },
@@ -191,37 +415,19 @@ def activity_timeline_data(request):
         .order_by('date')
     )
 
-    # Get first touchpoint per person
-    first_touchpoints = []
-    events_with_people = ActivityEvent.objects.filter(
-        customer_org_id=customer_org_id,
-        account_id=account_id
-    ).exclude(people__isnull=True).exclude(people=[]).order_by('timestamp')
-
-    seen_people = set()
-    for event in events_with_people:
-        if event.people and isinstance(event.people, list):
-            for person in event.people:
-                if isinstance(person, dict) and 'id' in person:
-                    person_id = person['id']
-                    if person_id not in seen_people:
-                        seen_people.add(person_id)
-                        first_touchpoints.append({
-                            'person_id': person_id,
-                            'timestamp': event.timestamp.isoformat(),
-                            'date': event.timestamp.date().isoformat()
-                        })
+    # First touchpoint per person
+    first_touchpoints = _first_touchpoints(customer_org_id, account_id)
 
     # Convert daily counts to list
     timeline_data = [
         {
-            'date': item['date'].isoformat(),
+            'date': item['date'],
             'count': item['count']
         }
         for item in daily_counts
     ]
 
-    return JsonResponse({
+    return json_response({
         'timeline_data': timeline_data,
         'first_touchpoints': first_touchpoints
     })